@@ -2,17 +2,27 @@
 Base agent class for AI-powered tasks.
 """
 
+import asyncio
+from collections.abc import AsyncGenerator, Sequence
 import importlib.resources
-from typing import Generic, TypeVar
+import re
+from typing import ClassVar, Generic, TypeVar
 
 import jinja2
+import jinja2.meta
 from pydantic import BaseModel
 
+from app.config import settings
 from app.llm.base import LLMProvider
+from app.llm.cache import make_cache_key, response_cache
+from app.llm.concurrency import get_llm_semaphore
 
 TInput = TypeVar("TInput", bound=BaseModel)
 TOutput = TypeVar("TOutput", bound=BaseModel)
 
+# Content between markdown code fences, handling both ```json and ``` variants
+_CODE_BLOCK_RE = re.compile(r"```(?:json)?\s*\n?(.*?)\n?```", re.DOTALL)
+
 
 class BaseAgent(Generic[TInput, TOutput]):
     """
@@ -27,11 +37,40 @@ class BaseAgent(Generic[TInput, TOutput]):
     input_model: type[TInput]
     output_model: type[TOutput]
 
+    # Set to False for agents whose responses must not be reused across identical prompts
+    cache_responses: ClassVar[bool] = True
+
+    # Package holding the agent's prompt templates, resolved once per subclass
+    _template_package: ClassVar[str]
+
+    # Environment compiling all prompt templates; block tags don't leave blank lines
+    # behind, so rendered prompts carry no whitespace-only tokens
+    _jinja_env: ClassVar[jinja2.Environment] = jinja2.Environment(
+        trim_blocks=True, lstrip_blocks=True, auto_reload=False
+    )
+
+    # Compiled templates shared by all agents, keyed by (template package, template name)
+    _template_cache: ClassVar[dict[tuple[str, str], jinja2.Template]] = {}
+
+    # Output of templates that reference no variables, rendered once when first loaded
+    _static_prompt_cache: ClassVar[dict[tuple[str, str], str]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Templates live next to the module defining the agent
+        agent_module = cls.__module__
+        if agent_module.endswith("insight"):
+            cls._template_package = "app.agents.insight"
+        else:
+            cls._template_package = agent_module.rsplit(".", 1)[0]
+
     def __init__(self, llm_provider: LLMProvider):
         """
         Initialize the agent with an LLM provider.
         """
         self.llm_provider = llm_provider
+        # Overrides the process-wide LLM concurrency limit when set
+        self._llm_semaphore: asyncio.Semaphore | None = None
 
     async def execute(self, input_data: TInput) -> TOutput:
         """
@@ -43,6 +82,87 @@ class BaseAgent(Generic[TInput, TOutput]):
         Returns:
             Generated output as the defined output model type
         """
+        messages = self._build_messages(input_data)
+
+        # Reuse the response of an identical earlier request when caching is enabled
+        cache_key = None
+        cached_response = None
+        if self.cache_responses and settings.LLM_CACHE_ENABLED:
+            cache_key = make_cache_key(
+                messages,
+                agent=self.__class__.__qualname__,
+                provider=self.llm_provider.__class__.__qualname__,
+                **self.llm_provider.cache_params,
+            )
+            cached_response = response_cache.get(cache_key)
+
+        if cached_response is not None:
+            response = cached_response
+        else:
+            # Generate response (LLM provider handles its own configuration)
+            async with self._llm_semaphore or get_llm_semaphore():
+                response = await self.llm_provider.generate(messages)
+
+        # Parse and validate response
+        try:
+            # Extract JSON from markdown code blocks if present
+            json_content = self._extract_json_from_response(response)
+            output = self.output_model.model_validate_json(json_content)
+        except Exception as e:
+            raise AgentProcessingError(
+                f"Failed to parse response as {self.output_model.__name__}: {e}"
+            ) from e
+
+        # Only responses that parsed successfully are cached
+        if cache_key is not None and cached_response is None:
+            response_cache.set(cache_key, response)
+
+        return output
+
+    async def execute_many(self, inputs: Sequence[TInput]) -> list[TOutput]:
+        """
+        Execute the agent for several inputs concurrently.
+
+        LLM calls overlap up to the configured concurrency limit and results
+        are returned in the same order as the inputs.
+
+        Args:
+            inputs: Input data models
+
+        Returns:
+            Generated outputs, one per input
+        """
+        return list(await asyncio.gather(*(self.execute(input_data) for input_data in inputs)))
+
+    async def stream(self, input_data: TInput) -> AsyncGenerator[str, None]:
+        """
+        Execute the agent and yield the raw response text as it is generated.
+
+        The concatenated chunks form the same document that execute() parses,
+        but streamed responses are neither cached nor validated here.
+
+        Args:
+            input_data: Input data as a Pydantic model
+
+        Yields:
+            Chunks of generated text
+        """
+        messages = self._build_messages(input_data)
+
+        async with self._llm_semaphore or get_llm_semaphore():
+            async for chunk in self.llm_provider.generate_stream(messages):
+                yield chunk
+
+    def _build_messages(self, input_data: TInput) -> list[dict[str, str]]:
+        """
+        Validate the input and render the agent's prompts into chat messages.
+
+        Args:
+            input_data: Input data as a Pydantic model
+
+        Returns:
+            System and user messages for the LLM
+        """
         # Validate input type
         if not isinstance(input_data, self.input_model):
             raise AgentValidationError(
@@ -50,33 +170,17 @@ class BaseAgent(Generic[TInput, TOutput]):
                 f"got {type(input_data).__name__}"
             )
 
-        # Load agent templates
-        system_template = self._load_template("prompts/system.j2")
-        user_template = self._load_template("prompts/user.j2")
-
-        # Render prompts with input data
-        system_prompt = system_template.render(**input_data.model_dump())
-        user_prompt = user_template.render(**input_data.model_dump())
+        # Render prompts with input data, dumping the model only once
+        context = input_data.model_dump()
+        system_prompt = self._render_template("prompts/system.j2", context)
+        user_prompt = self._render_template("prompts/user.j2", context)
 
         # Prepare messages for LLM
-        messages = [
+        return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
 
-        # Generate response (LLM provider handles its own configuration)
-        response = await self.llm_provider.generate(messages)
-
-        # Parse and validate response
-        try:
-            # Extract JSON from markdown code blocks if present
-            json_content = self._extract_json_from_response(response)
-            return self.output_model.model_validate_json(json_content)
-        except Exception as e:
-            raise AgentProcessingError(
-                f"Failed to parse response as {self.output_model.__name__}: {e}"
-            ) from e
-
     def _extract_json_from_response(self, response: str) -> str:
         """
         Extract JSON content from LLM response, handling markdown code blocks.
@@ -87,39 +191,55 @@ class BaseAgent(Generic[TInput, TOutput]):
         Returns:
             Clean JSON string
         """
-        import re
-
-        # Remove leading/trailing whitespace
-        response = response.strip()
+        # Plain JSON is returned untouched; pydantic ignores surrounding whitespace
+        stripped = response.lstrip()
+        if not stripped.startswith("```"):
+            return response
 
-        # Check if response is wrapped in markdown code blocks
-        if response.startswith("```"):
-            # Use regex to extract content between code blocks
-            # Handles both ```json and ``` variants
-            pattern = r"```(?:json)?\s*\n?(.*?)\n?```"
-            match = re.search(pattern, response, re.DOTALL)
-            if match:
-                return match.group(1).strip()
+        # Use regex to extract content between code blocks
+        match = _CODE_BLOCK_RE.search(stripped)
+        if match:
+            return match.group(1).strip()
 
-        # If no code blocks found, return original response
+        # If no closing code block found, return original response
         return response
 
+    def _render_template(self, template_name: str, context: dict) -> str:
+        """
+        Render a prompt template, reusing the output of templates without variables.
+
+        Args:
+            template_name: Template path relative to the agent's package
+            context: Template variables
+
+        Returns:
+            Rendered prompt text
+        """
+        rendered = self._static_prompt_cache.get((self._template_package, template_name))
+        if rendered is not None:
+            return rendered
+        return self._load_template(template_name).render(context)
+
     def _load_template(self, template_name: str) -> jinja2.Template:
-        """Load and compile a Jinja2 template."""
-        try:
-            # Get the agent's module directory
-            agent_module = self.__class__.__module__
-            if agent_module.endswith("insight"):
-                pkg = importlib.resources.files("app.agents.insight")
-            else:
-                agent_package = agent_module.rsplit(".", 1)[0]
-                pkg = importlib.resources.files(agent_package)
+        """Load and compile a Jinja2 template, reusing the compiled template on later calls."""
+        cache_key = (self._template_package, template_name)
+        template = self._template_cache.get(cache_key)
+        if template is not None:
+            return template
 
+        try:
+            pkg = importlib.resources.files(self._template_package)
             template_text = (pkg / template_name).read_text()
-            return jinja2.Template(template_text)
+            parsed = self._jinja_env.parse(template_text)
+            template = self._jinja_env.from_string(parsed)
         except (FileNotFoundError, jinja2.TemplateError) as e:
             raise AgentValidationError(f"Failed to load template {template_name}: {e}") from e
 
+        self._template_cache[cache_key] = template
+        if not jinja2.meta.find_undeclared_variables(parsed):
+            self._static_prompt_cache[cache_key] = template.render()
+        return template
+
 
 class AgentError(Exception):
     """Base exception for agent errors."""
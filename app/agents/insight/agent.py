@@ -29,6 +29,32 @@ class InsightRequest(BaseModel):
             raise ValueError("At least one itinerary is required")
         return v
 
+    @classmethod
+    def trusted(
+        cls,
+        itineraries: list[Itinerary],
+        user_preferences: list[Preference] | None = None,
+        weather_conditions: WeatherCondition | None = None,
+    ) -> "InsightRequest":
+        """
+        Build a request from already validated models without validating it again.
+
+        Callers are responsible for passing a non-empty list of itineraries.
+
+        Args:
+            itineraries: Validated itineraries to analyse
+            user_preferences: Validated user preferences
+            weather_conditions: Validated weather conditions
+
+        Returns:
+            Insight request holding the given models as-is
+        """
+        return cls.model_construct(
+            itineraries=itineraries,
+            user_preferences=user_preferences,
+            weather_conditions=weather_conditions,
+        )
+
 
 class InsightResponse(BaseModel):
     """Response schema for insight generation."""
@@ -36,7 +62,7 @@ class InsightResponse(BaseModel):
     itinerary_insights: list[ItineraryInsight]
 
 
-class InsightAgent(BaseAgent):
+class InsightAgent(BaseAgent[InsightRequest, InsightResponse]):
     """AI agent for generating insights about travel itineraries."""
 
     input_model = InsightRequest
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from collections.abc import AsyncGenerator
+import json
+import logging
 
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.concurrency import run_in_threadpool
+
+from app.agents.base import AgentError
 from app.dependencies import get_insight_service
 from app.llm.base import LLMError
 from app.schemas.itinerary import Itinerary, ItineraryInsight
 from app.schemas.preference import Preference
 from app.services.insight import InsightService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -19,6 +28,28 @@ class ItinerariesResponse(BaseModel):
     itinerary_insights: list[ItineraryInsight]
 
 
+class ItineraryInsightEvent(BaseModel):
+    """Insight for the itinerary at `index` in the request, sent as one streamed event."""
+
+    index: int
+    insight: ItineraryInsight
+
+
+# Serializes responses straight to JSON bytes, skipping the intermediate str
+_RESPONSE_ADAPTER = TypeAdapter(ItinerariesResponse)
+
+# Responses with at least this many insights are serialized off the event loop
+_THREADPOOL_MIN_INSIGHTS = 50
+
+
+def _require_itineraries(request: ItinerariesRequest) -> None:
+    """Reject requests without itineraries before any insight work is started."""
+    if not request.itineraries:
+        raise HTTPException(
+            status_code=400, detail="Invalid request: At least one itinerary is required"
+        )
+
+
 @router.post("/itineraries", response_model=ItinerariesResponse)
 async def generate_itineraries_with_insights(
     request: ItinerariesRequest, insight_service: InsightService = Depends(get_insight_service)
@@ -26,13 +57,23 @@ async def generate_itineraries_with_insights(
     """
     Generate AI insights for travel itineraries.
     """
+    _require_itineraries(request)
+
     try:
         # Generate insights using the service
         insights = await insight_service.generate_insights(
             itineraries=request.itineraries, user_preferences=request.user_preferences
         )
 
-        return ItinerariesResponse(itinerary_insights=insights)
+        # Insights were validated when parsed from the LLM output, so skip re-validation
+        response = ItinerariesResponse.model_construct(itinerary_insights=insights)
+
+        # Serialize directly; a returned Response skips FastAPI's response_model re-validation
+        if len(insights) >= _THREADPOOL_MIN_INSIGHTS:
+            content = await run_in_threadpool(_RESPONSE_ADAPTER.dump_json, response)
+        else:
+            content = _RESPONSE_ADAPTER.dump_json(response)
+        return Response(content=content, media_type="application/json")
 
     except LLMError as e:
         raise HTTPException(
@@ -42,3 +83,35 @@ async def generate_itineraries_with_insights(
         raise HTTPException(status_code=400, detail=f"Invalid request: {str(e)}") from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}") from e
+
+
+@router.post("/itineraries/stream")
+async def stream_itineraries_with_insights(
+    request: ItinerariesRequest, insight_service: InsightService = Depends(get_insight_service)
+):
+    """
+    Stream AI insights for travel itineraries as Server-Sent Events.
+
+    Each event carries the index of an itinerary in the request and its insight,
+    sent as soon as that itinerary has been analysed.
+    """
+    _require_itineraries(request)
+
+    def error_event(detail: str) -> str:
+        return f"event: error\ndata: {json.dumps({'detail': detail})}\n\n"
+
+    async def events() -> AsyncGenerator[str, None]:
+        try:
+            async for index, insight in insight_service.stream_insights(
+                itineraries=request.itineraries, user_preferences=request.user_preferences
+            ):
+                event = ItineraryInsightEvent.model_construct(index=index, insight=insight)
+                yield f"data: {event.model_dump_json()}\n\n"
+        except (LLMError, AgentError) as e:
+            # Headers are already sent, so failures are reported in-band
+            yield error_event(str(e))
+        except Exception as e:
+            logger.exception("Failed to stream itinerary insights")
+            yield error_event(f"Internal server error: {str(e)}")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -12,6 +12,23 @@ class Settings(BaseSettings):
 
     # LLM Configuration
     LLM_PROVIDER: str = "groq"
+    LLM_MAX_CONCURRENCY: int = 8
+
+    # Connection pool shared by all LLM provider clients
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    LLM_HTTP_TIMEOUT: float = 60.0
+    LLM_HTTP_CONNECT_TIMEOUT: float = 5.0
+
+    # LLM response cache (exact match on rendered prompts)
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_MAXSIZE: int = 10_000
+    LLM_CACHE_TTL: int = 3600
+
+    # Per-itinerary insight cache (keyed on a normalized route summary)
+    INSIGHT_CACHE_ENABLED: bool = False
+    INSIGHT_CACHE_MAXSIZE: int = 10_000
+    INSIGHT_CACHE_TTL: int = 3600
 
     # Groq Configuration
     GROQ_API_KEY: str | None = None
@@ -23,6 +40,10 @@ class Settings(BaseSettings):
 
     # Weather Configuration
     OPENWEATHERMAP_API_KEY: str | None = None
+    WEATHER_CACHE_TTL: int = 600
+    WEATHER_CACHE_MAXSIZE: int = 512
+    WEATHER_CACHE_FALLBACK: bool = True
+    WEATHER_CACHE_STALE_TTL: int = 86400
 
     class ConfigDict:
         env_file = ".env"
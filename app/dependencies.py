@@ -2,8 +2,31 @@
 FastAPI dependency injection for application services.
 """
 
+from functools import lru_cache
+import logging
+
+from fastapi import Depends
+
+from app.config import settings
 from app.services.insight import InsightService
+from app.services.weather import WeatherService
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_weather_service() -> WeatherService | None:
+    """Get the shared weather service, or None if weather is not configured."""
+    if not settings.OPENWEATHERMAP_API_KEY:
+        # Insights work without weather data
+        logger.warning("OPENWEATHERMAP_API_KEY is not set, proceeding without weather data")
+        return None
+    return WeatherService()
 
 
-def get_insight_service() -> InsightService:
-    return InsightService()
+@lru_cache(maxsize=1)
+def get_insight_service(
+    weather_service: WeatherService | None = Depends(get_weather_service),
+) -> InsightService:
+    """Get the shared insight service, so its LLM provider and agent are built once."""
+    return InsightService(weather_service=weather_service)
@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
-from collections.abc import AsyncGenerator
+import asyncio
+from collections.abc import AsyncGenerator, Sequence
+import contextlib
 from typing import Any
 
+from app.llm.concurrency import RateLimiter, get_llm_semaphore
+
 
 class LLMProvider(ABC):
     """
@@ -65,6 +69,77 @@ class LLMProvider(ABC):
         """
         pass
 
+    @property
+    def cache_params(self) -> dict[str, Any]:
+        """
+        Settings that shape responses to calls made without explicit options.
+
+        Response caches include these in their keys, so responses are not reused
+        across models or sampling settings.
+        """
+        return {}
+
+    async def warmup(self) -> None:
+        """
+        Open a connection to the provider ahead of the first request.
+
+        Providers without a persistent connection need not override this.
+        Failures are not raised, as warming up is only an optimization.
+        """
+        return None
+
+    async def generate_batch(
+        self,
+        batch: Sequence[list[dict[str, str]]],
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        max_concurrency: int | None = None,
+        requests_per_minute: int | None = None,
+        max_retries: int = 2,
+        retry_backoff: float = 1.0,
+        **kwargs: Any,
+    ) -> list[str]:
+        """
+        Generate responses for several independent conversations concurrently.
+
+        Args:
+            batch: Message lists, one per conversation
+            max_tokens: Maximum tokens to generate per response
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_concurrency: Maximum number of this batch's requests in flight at once,
+                on top of the process-wide LLM concurrency limit
+            requests_per_minute: Maximum rate at which requests are started, if limited
+            max_retries: Times a rate-limited request is retried before failing
+            retry_backoff: Delay in seconds before the first retry, doubled on each retry
+            **kwargs: Additional provider-specific parameters
+
+        Returns:
+            Generated text responses, in the same order as the batch
+
+        Raises:
+            LLMError: If any generation fails
+        """
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+
+        async def generate_one(messages: list[dict[str, str]]) -> str:
+            attempt = 0
+            while True:
+                if limiter:
+                    await limiter.acquire()
+                try:
+                    # Concurrency slots are held per attempt, not while backing off
+                    async with semaphore or contextlib.nullcontext(), get_llm_semaphore():
+                        return await self.generate(messages, max_tokens, temperature, **kwargs)
+                except LLMRateLimitError:
+                    if attempt == max_retries:
+                        raise
+                # Back off exponentially before retrying a rate-limited request
+                await asyncio.sleep(retry_backoff * 2**attempt)
+                attempt += 1
+
+        return list(await asyncio.gather(*(generate_one(messages) for messages in batch)))
+
 
 class LLMError(Exception):
     """Base exception for LLM provider errors."""
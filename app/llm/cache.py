@@ -0,0 +1,32 @@
+"""
+Exact-match cache for LLM responses.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from app.config import settings
+from app.utils.cache import TTLCache
+
+response_cache: TTLCache[bytes, str] = TTLCache(
+    maxsize=settings.LLM_CACHE_MAXSIZE, ttl=settings.LLM_CACHE_TTL
+)
+
+
+def make_cache_key(messages: list[dict[str, str]], **params: Any) -> bytes:
+    """
+    Build a cache key from the full message list and generation parameters.
+
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        **params: Anything else that affects the response (provider, model, sampling options)
+
+    Returns:
+        Digest identifying the request
+    """
+    # Compact separators keep the hashed payload small; the raw digest hashes faster as a dict key
+    payload = json.dumps(
+        {"messages": messages, "params": params}, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.blake2b(payload.encode()).digest()
@@ -0,0 +1,53 @@
+"""
+Process-wide limit on concurrent LLM requests.
+"""
+
+import asyncio
+import weakref
+
+from app.config import settings
+
+# asyncio primitives are bound to the loop they are first used on, so keep one per loop
+_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """
+    Get the semaphore bounding concurrent LLM requests on the running event loop.
+
+    Every agent shares it, so the limit holds across requests and agent
+    instances rather than per agent.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+class RateLimiter:
+    """
+    Spaces out acquisitions evenly so that at most `rate` happen per `period` seconds.
+    """
+
+    def __init__(self, rate: int, period: float = 60.0):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Maximum number of acquisitions per period
+            period: Length of the period in seconds
+        """
+        self._interval = period / rate
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until the next evenly spaced slot is available."""
+        now = asyncio.get_running_loop().time()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
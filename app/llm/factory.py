@@ -2,13 +2,15 @@
 Factory for creating LLM provider instances.
 """
 
-from enum import Enum
+from enum import StrEnum
+from typing import Any, ClassVar
 
 from .base import LLMProvider
+from .http import close_http_client
 from .providers.groq import GroqProvider
 
 
-class LLMProviderType(str, Enum):
+class LLMProviderType(StrEnum):
     GROQ = "groq"
 
 
@@ -17,11 +19,48 @@ class LLMProviderFactory:
     Factory class for creating LLM provider instances based on configuration.
     """
 
-    @staticmethod
-    def create_provider(provider: LLMProviderType, **kwargs) -> LLMProvider:
+    # Providers already created, keyed by provider type and constructor arguments
+    _providers: ClassVar[dict[tuple[LLMProviderType, frozenset[tuple[str, Any]]], LLMProvider]] = {}
+
+    @classmethod
+    def create_provider(cls, provider: LLMProviderType, **kwargs) -> LLMProvider:
         """
         Create an LLM provider instance.
+
+        Providers are reused for identical arguments, so repeated calls share one
+        SDK client instead of constructing a new one each time.
+
+        Raises:
+            ValueError: If the provider type is not supported
+        """
+        try:
+            cache_key = (provider, frozenset(kwargs.items()))
+        except TypeError:
+            # Unhashable arguments cannot be memoized
+            return cls._construct(provider, **kwargs)
+
+        instance = cls._providers.get(cache_key)
+        if instance is None:
+            # Stored only once constructed, so a failed construction is retried next time
+            instance = cls._construct(provider, **kwargs)
+            cls._providers[cache_key] = instance
+        return instance
+
+    @staticmethod
+    def _construct(provider: LLMProviderType, **kwargs) -> LLMProvider:
+        """
+        Construct a new LLM provider instance.
         """
         match provider:
             case LLMProviderType.GROQ:
                 return GroqProvider(**kwargs)
+            case _:
+                raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """
+        Close the HTTP connection pool shared by all created providers and forget them.
+        """
+        cls._providers.clear()
+        await close_http_client()
@@ -2,15 +2,80 @@
 Groq provider implementation.
 """
 
+import asyncio
 from collections.abc import AsyncGenerator
-from typing import Any, cast
+import logging
+import re
+from typing import TYPE_CHECKING, Any
 
+import groq
 from groq import AsyncGroq
-from groq.types.chat import ChatCompletionMessageParam
 
 from app.config import settings
 
-from ..base import LLMConnectionError, LLMProvider, LLMRateLimitError, LLMValidationError
+from ..base import (
+    LLMConnectionError,
+    LLMError,
+    LLMProvider,
+    LLMRateLimitError,
+    LLMValidationError,
+)
+from ..http import get_http_client
+
+if TYPE_CHECKING:
+    from groq.types.chat import ChatCompletionChunk, ChatCompletionMessageParam
+
+logger = logging.getLogger(__name__)
+
+# Generation defaults used when the caller does not set a value
+_DEFAULT_MAX_TOKENS = 2048
+_DEFAULT_TEMPERATURE = 0.5
+_DEFAULT_STREAM_MAX_TOKENS = 1000
+_DEFAULT_STREAM_TEMPERATURE = 0.7
+
+# Seconds to wait for the warm-up connection before giving up
+_WARMUP_TIMEOUT = 2.0
+
+# Streamed deltas are flushed once this many characters are buffered or this many seconds passed
+_STREAM_FLUSH_CHARS = 64
+_STREAM_FLUSH_INTERVAL = 0.01
+
+# Groq requires the word "json" somewhere in the messages when using json_object format
+_JSON_RE = re.compile("json", re.IGNORECASE)
+
+# Groq client exceptions checked in order, with the error type and description they map to
+_ERROR_TYPES: tuple[
+    tuple[type[Exception] | tuple[type[Exception], ...], type[LLMError], str], ...
+] = (
+    (groq.RateLimitError, LLMRateLimitError, "rate limit exceeded"),
+    (
+        (groq.AuthenticationError, groq.PermissionDeniedError),
+        LLMValidationError,
+        "authentication error",
+    ),
+    (
+        (groq.BadRequestError, groq.UnprocessableEntityError),
+        LLMValidationError,
+        "validation error",
+    ),
+    (groq.APIConnectionError, LLMConnectionError, "connection error"),
+)
+
+
+def _classify_error(error: Exception) -> LLMError:
+    """
+    Map an exception raised by the Groq client to the matching LLM error.
+
+    Args:
+        error: Exception raised while calling the Groq API
+
+    Returns:
+        LLM error describing the failure
+    """
+    for error_types, error_class, description in _ERROR_TYPES:
+        if isinstance(error, error_types):
+            return error_class(f"Groq {description}: {error}")
+    return LLMConnectionError(f"Groq API error: {error}")
 
 
 class GroqProvider(LLMProvider):
@@ -27,17 +92,41 @@ class GroqProvider(LLMProvider):
         """
         self._api_key = settings.GROQ_API_KEY
         self._model = settings.GROQ_MODEL
+        self._http_client = kwargs.setdefault("http_client", get_http_client())
         self._client = AsyncGroq(api_key=self._api_key, **kwargs)
 
+    @property
+    def cache_params(self) -> dict[str, Any]:
+        """
+        Model and generation defaults used by generate when no options are given.
+        """
+        return {
+            "model": self._model,
+            "max_tokens": _DEFAULT_MAX_TOKENS,
+            "temperature": _DEFAULT_TEMPERATURE,
+        }
+
+    async def warmup(self) -> None:
+        """
+        Establish a pooled keep-alive connection to the Groq API.
+
+        The TCP and TLS handshakes then happen here instead of on the first real request.
+        Any failure is logged rather than raised, so it cannot abort startup.
+        """
+        try:
+            await self._http_client.head(str(self._client.base_url), timeout=_WARMUP_TIMEOUT)
+        except Exception as error:
+            logger.warning("Failed to warm up Groq connection: %s", error)
+
     def _should_use_json_format(self, messages: list[dict[str, str]]) -> bool:
         """
-        Determine if JSON format should be used based on message content.
+        Determine if JSON format should be used based on the system message.
+
+        Only the system message is scanned, so long chat histories cost nothing.
+        Callers signalling JSON elsewhere can pass response_format explicitly.
         """
-        for message in messages:
-            content = message.get("content", "").lower()
-            if "json" in content:
-                return True
-        return False
+        system_message = next((m for m in messages if m.get("role") == "system"), None)
+        return bool(system_message and _JSON_RE.search(system_message.get("content", "")))
 
     async def generate(
         self,
@@ -49,17 +138,19 @@ class GroqProvider(LLMProvider):
         """
         Generate text response using Groq Chat Completions API.
         """
-        # Set defaults
-        max_tokens = max_tokens or 2048
-        temperature = temperature or 0.5
+        # Set defaults; an explicit temperature of 0 is respected
+        if max_tokens is None:
+            max_tokens = _DEFAULT_MAX_TOKENS
+        if temperature is None:
+            temperature = _DEFAULT_TEMPERATURE
 
-        # Determine if JSON format should be used based on message content
+        # Determine if JSON format should be used, unless the caller chose a response format
         # Groq requires the word "json" in messages when using json_object format
-        use_json_format = self._should_use_json_format(messages)
+        use_json_format = "response_format" not in kwargs and self._should_use_json_format(messages)
 
         try:
-            # Call Groq API - cast messages to proper type for Groq client
-            groq_messages = cast(list[ChatCompletionMessageParam], messages)
+            # Annotation only informs type checkers; unlike cast() it costs nothing at runtime
+            groq_messages: list[ChatCompletionMessageParam] = messages  # type: ignore[assignment]
 
             # Prepare request parameters
             request_params = {
@@ -82,23 +173,7 @@ class GroqProvider(LLMProvider):
             return response.choices[0].message.content or ""
 
         except Exception as e:
-            # Handle specific Groq exceptions
-            error_str = str(e).lower()
-            if "rate_limit" in error_str or "429" in error_str:
-                raise LLMRateLimitError(f"Groq rate limit exceeded: {e}") from e
-            elif (
-                "validation" in error_str
-                or "invalid" in error_str
-                or "400" in error_str
-                or "bad request" in error_str
-            ):
-                raise LLMValidationError(f"Groq validation error: {e}") from e
-            elif "unauthorized" in error_str or "401" in error_str or "api key" in error_str:
-                raise LLMValidationError(f"Groq authentication error: {e}") from e
-            elif "connection" in error_str or "timeout" in error_str or "network" in error_str:
-                raise LLMConnectionError(f"Groq connection error: {e}") from e
-            else:
-                raise LLMConnectionError(f"Groq API error: {e}") from e
+            raise _classify_error(e) from e
 
     def generate_stream(
         self,
@@ -120,13 +195,17 @@ class GroqProvider(LLMProvider):
         **kwargs: Any,
     ) -> AsyncGenerator[str, None]:
         """Internal async generator for streaming."""
-        # Set defaults
-        max_tokens = max_tokens or 1000
-        temperature = temperature or 0.7
+        # Set defaults; an explicit temperature of 0 is respected
+        if max_tokens is None:
+            max_tokens = _DEFAULT_STREAM_MAX_TOKENS
+        if temperature is None:
+            temperature = _DEFAULT_STREAM_TEMPERATURE
 
         try:
-            # Call Groq streaming API - cast messages to proper type for Groq client
-            groq_messages = cast(list[ChatCompletionMessageParam], messages)
+            # Annotation only informs type checkers; unlike cast() it costs nothing at runtime
+            groq_messages: list[ChatCompletionMessageParam] = messages  # type: ignore[assignment]
+
+            # Call Groq streaming API
             stream = await self._client.chat.completions.create(
                 model=self._model,
                 messages=groq_messages,
@@ -136,25 +215,57 @@ class GroqProvider(LLMProvider):
                 **kwargs,
             )
 
-            async for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            # Coalesce small token deltas so consumers handle fewer, larger chunks; while
+            # text is buffered, waiting for the next delta times out so a stalled model
+            # cannot hold it back past the flush interval
+            loop = asyncio.get_running_loop()
+            buffer: list[str] = []
+            buffered_chars = 0
+            last_flush = loop.time()
+            next_chunk: asyncio.Future[ChatCompletionChunk] | None = None
+            try:
+                while True:
+                    if next_chunk is None:
+                        next_chunk = asyncio.ensure_future(stream.__anext__())
+                    timeout = (
+                        _STREAM_FLUSH_INTERVAL - (loop.time() - last_flush) if buffer else None
+                    )
+                    try:
+                        # Shielded so a timeout leaves the pending read running
+                        chunk = await asyncio.wait_for(asyncio.shield(next_chunk), timeout)
+                    except TimeoutError:
+                        yield "".join(buffer)
+                        buffer.clear()
+                        buffered_chars = 0
+                        last_flush = loop.time()
+                        continue
+                    except StopAsyncIteration:
+                        break
+                    next_chunk = None
+
+                    choices = chunk.choices
+                    if not choices:
+                        continue
+                    content = choices[0].delta.content
+                    if content is None:
+                        continue
+                    buffer.append(content)
+                    buffered_chars += len(content)
+                    now = loop.time()
+                    if (
+                        buffered_chars >= _STREAM_FLUSH_CHARS
+                        or now - last_flush >= _STREAM_FLUSH_INTERVAL
+                    ):
+                        yield "".join(buffer)
+                        buffer.clear()
+                        buffered_chars = 0
+                        last_flush = now
+            finally:
+                if next_chunk is not None and not next_chunk.done():
+                    next_chunk.cancel()
+
+            if buffer:
+                yield "".join(buffer)
 
         except Exception as e:
-            # Handle specific Groq exceptions
-            error_str = str(e).lower()
-            if "rate_limit" in error_str or "429" in error_str:
-                raise LLMRateLimitError(f"Groq rate limit exceeded: {e}") from e
-            elif (
-                "validation" in error_str
-                or "invalid" in error_str
-                or "400" in error_str
-                or "bad request" in error_str
-            ):
-                raise LLMValidationError(f"Groq validation error: {e}") from e
-            elif "unauthorized" in error_str or "401" in error_str or "api key" in error_str:
-                raise LLMValidationError(f"Groq authentication error: {e}") from e
-            elif "connection" in error_str or "timeout" in error_str or "network" in error_str:
-                raise LLMConnectionError(f"Groq connection error: {e}") from e
-            else:
-                raise LLMConnectionError(f"Groq API error: {e}") from e
+            raise _classify_error(e) from e
@@ -1,3 +1,5 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 import logging
 
 from fastapi import FastAPI
@@ -5,15 +7,33 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.routes import router
 from app.config import settings
+from app.dependencies import get_insight_service, get_weather_service
+from app.llm.factory import LLMProviderFactory, LLMProviderType
+from app.services.http import close_http_session
 from app.utils import logger as _  # noqa: F401 - Import to configure logging
 
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    # Open the LLM API connection before the first request needs it
+    if settings.GROQ_API_KEY:
+        await LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ).warmup()
+    yield
+    # Release pooled keep-alive connections to the LLM and weather APIs on shutdown
+    await LLMProviderFactory.aclose()
+    await close_http_session()
+    # Drop services holding the closed clients so a restarted app builds fresh ones
+    get_insight_service.cache_clear()
+    get_weather_service.cache_clear()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
     version=settings.VERSION,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
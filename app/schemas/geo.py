@@ -5,7 +5,7 @@ Pydantic models for representing geographic locations, coordinates,
 and related data structures used throughout the application.
 """
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class Coordinates(BaseModel):
@@ -13,6 +13,8 @@ class Coordinates(BaseModel):
     Geographic coordinates (latitude and longitude).
     """
 
+    model_config = ConfigDict(frozen=True)
+
     latitude: float = Field(..., ge=-90.0, le=90.0, description="Latitude in decimal degrees")
     longitude: float = Field(..., ge=-180.0, le=180.0, description="Longitude in decimal degrees")
 
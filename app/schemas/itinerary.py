@@ -4,11 +4,10 @@ Itinerary Schema
 Pydantic models for representing transit routes and itineraries.
 """
 
-from collections.abc import Sequence
 from datetime import datetime
 from enum import Enum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.schemas.location import Place
 
@@ -29,6 +28,8 @@ class TransportMode(str, Enum):
 class Route(BaseModel):
     """Route information for a leg of the journey."""
 
+    model_config = ConfigDict(frozen=True)
+
     short_name: str = Field(..., description="Short name of the route, e.g., bus number")
     long_name: str = Field(..., description="Long name of the route, e.g., full route name")
     description: str | None = Field(None, description="Description of the route")
@@ -37,6 +38,8 @@ class Route(BaseModel):
 class Leg(BaseModel):
     """A single segment of a journey."""
 
+    model_config = ConfigDict(frozen=True)
+
     mode: TransportMode
     start: datetime
     end: datetime
@@ -50,12 +53,14 @@ class Leg(BaseModel):
 class Itinerary(BaseModel):
     """A complete journey from origin to destination."""
 
+    model_config = ConfigDict(frozen=True)
+
     start: datetime
     end: datetime
     duration: int = Field(..., description="Total duration in seconds")
     walk_distance: float = Field(..., description="Total walking distance in meters")
     walk_time: int = Field(..., description="Total walking time in seconds")
-    legs: Sequence[Leg]
+    legs: tuple[Leg, ...]
 
 
 class LegInsight(BaseModel):
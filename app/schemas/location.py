@@ -4,7 +4,7 @@ Location Schema
 Pydantic models for representing places and locations.
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from app.schemas.geo import Coordinates
 
@@ -12,5 +12,7 @@ from app.schemas.geo import Coordinates
 class Place(BaseModel):
     """A place with metadata"""
 
+    model_config = ConfigDict(frozen=True)
+
     coordinates: Coordinates
     name: str | None = None
@@ -0,0 +1,33 @@
+"""
+Shared HTTP session for external API services.
+"""
+
+import aiohttp
+
+_http_session: aiohttp.ClientSession | None = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Get the process-wide HTTP session, creating it on first use.
+
+    Services share this session so that connection pooling, DNS caching and
+    keep-alive connections are managed in one place.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=5.0, connect=2.0),
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=60
+            ),
+        )
+    return _http_session
+
+
+async def close_http_session() -> None:
+    """Close the process-wide HTTP session and its pooled connections, if it was created."""
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
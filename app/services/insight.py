@@ -1,33 +1,125 @@
+import asyncio
+from collections.abc import AsyncGenerator
+import hashlib
+import json
 import logging
 
+from app.agents.base import AgentProcessingError
 from app.agents.insight.agent import InsightAgent, InsightRequest
+from app.config import settings
+from app.llm.base import LLMProvider
 from app.llm.factory import LLMProviderFactory, LLMProviderType
 from app.schemas.geo import Coordinates
 from app.schemas.itinerary import Itinerary, ItineraryInsight
 from app.schemas.preference import Preference
 from app.schemas.weather import WeatherCondition
 from app.services.weather import WeatherService, WeatherServiceError
+from app.utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+insight_cache: TTLCache[bytes, ItineraryInsight] = TTLCache(
+    maxsize=settings.INSIGHT_CACHE_MAXSIZE, ttl=settings.INSIGHT_CACHE_TTL
+)
+
+
+def make_insight_cache_key(
+    itinerary: Itinerary,
+    user_preferences: list[Preference] | None,
+    weather_conditions: WeatherCondition | None,
+) -> bytes:
+    """
+    Build a cache key from the parts of a request that shape an itinerary's insight.
+
+    Durations and walking distances are bucketed so the same route taken at a
+    different time of day maps to the same key.
+
+    Args:
+        itinerary: Itinerary the insight is generated for
+        user_preferences: User preferences included in the prompt
+        weather_conditions: Weather conditions included in the prompt
+
+    Returns:
+        Digest identifying the insight
+    """
+    payload = {
+        "legs": [
+            [
+                leg.mode.value,
+                leg.route.short_name if leg.route else None,
+                leg.from_place.name,
+                leg.to_place.name,
+                leg.duration // 300,
+            ]
+            for leg in itinerary.legs
+        ],
+        "duration": itinerary.duration // 300,
+        "walk_distance": int(itinerary.walk_distance // 100),
+        "preferences": sorted(p.prompt for p in user_preferences or ()),
+        "weather": (
+            [weather_conditions.description, round(weather_conditions.temperature)]
+            if weather_conditions
+            else None
+        ),
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode()).digest()
+
+
+def _route_identity(itinerary: Itinerary) -> tuple:
+    """
+    Identify an itinerary's route exactly, ignoring only when it departs.
+
+    Used to merge duplicate itineraries within one request, so unlike the
+    insight cache key nothing is bucketed.
+    """
+    return (
+        itinerary.duration,
+        itinerary.walk_distance,
+        tuple(
+            (
+                leg.mode,
+                leg.route.short_name if leg.route else None,
+                leg.from_place.name,
+                leg.to_place.name,
+                leg.duration,
+                leg.distance,
+            )
+            for leg in itinerary.legs
+        ),
+    )
+
+
+def _unique_routes(itineraries: list[Itinerary]) -> tuple[list[tuple], dict[tuple, Itinerary]]:
+    """
+    Identify the route of each itinerary and pick one itinerary per distinct route.
+
+    Args:
+        itineraries: Itineraries of a request
+
+    Returns:
+        Route identity of each itinerary, and the first itinerary found for each route
+    """
+    identities = [_route_identity(itinerary) for itinerary in itineraries]
+    unique_itineraries: dict[tuple, Itinerary] = {}
+    for identity, itinerary in zip(identities, itineraries, strict=True):
+        unique_itineraries.setdefault(identity, itinerary)
+    return identities, unique_itineraries
+
 
 class InsightService:
     """Business layer service for generating travel itinerary insights."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        weather_service: WeatherService | None = None,
+        llm_provider: LLMProvider | None = None,
+    ):
         """Initialize the service with an LLM provider and optional weather service."""
-        llm_provider = LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ)
+        if llm_provider is None:
+            llm_provider = LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ)
 
-        # Try to create weather service, but don't fail if it can't be initialized
-        try:
-            self._weather_service: WeatherService | None = WeatherService()
-        except ValueError as error:
-            # Weather service can't be initialized (likely missing API key)
-            # This is fine - insights will work without weather data
-            logging.warning(
-                "Weather service is not configured, proceeding without it: ", str(error)
-            )
-            self._weather_service = None
+        # Without a weather service, insights are generated without weather data
+        self._weather_service = weather_service
 
         self.insight_agent = InsightAgent(llm_provider)
 
@@ -49,6 +141,20 @@ class InsightService:
             logger.warning(f"Failed to get weather conditions for itinerary: {error}")
             return None
 
+    async def _get_weather_conditions(
+        self, itineraries: list[Itinerary]
+    ) -> WeatherCondition | None:
+        """Get the weather conditions shared by all itineraries of a request."""
+        # Get weather conditions for the first itinerary
+        weather_conditions = await self._get_weather_for_itinerary(itineraries[0])
+
+        logging.info(weather_conditions)
+
+        if not weather_conditions:
+            logger.warning("Weather data is not available for insight generation")
+
+        return weather_conditions
+
     async def generate_insights(
         self, itineraries: list[Itinerary], user_preferences: list[Preference] | None = None
     ) -> list[ItineraryInsight]:
@@ -57,24 +163,167 @@ class InsightService:
         if len(itineraries) == 0:
             raise ValueError("At least one itinerary is required")
 
-        # Get weather conditions for the first itinerary
-        weather_conditions = None
-        if itineraries:
-            weather_conditions = await self._get_weather_for_itinerary(itineraries[0])
+        weather_conditions = await self._get_weather_conditions(itineraries)
 
-        logging.info(weather_conditions)
+        # Identical routes (e.g. consecutive departures) are analysed only once
+        identities, unique_itineraries = _unique_routes(itineraries)
 
-        if not weather_conditions:
-            logger.warning("Weather data is not available for insight generation")
+        # Only itineraries without a cached insight are sent to the LLM
+        insights, cache_keys = self._get_cached_insights(
+            unique_itineraries, user_preferences, weather_conditions
+        )
+        misses = [identity for identity in unique_itineraries if identity not in insights]
+        if misses:
+            generated = await self._generate_uncached(
+                [unique_itineraries[identity] for identity in misses],
+                user_preferences,
+                weather_conditions,
+            )
+            for identity, insight in zip(misses, generated, strict=True):
+                insights[identity] = insight
+                if identity in cache_keys:
+                    insight_cache.set(cache_keys[identity], insight)
+
+        return [insights[identity] for identity in identities]
+
+    async def stream_insights(
+        self, itineraries: list[Itinerary], user_preferences: list[Preference] | None = None
+    ) -> AsyncGenerator[tuple[int, ItineraryInsight], None]:
+        """
+        Generate insights with one LLM call per distinct route, yielding each as it completes.
+
+        Duplicate routes and cached insights are handled as in generate_insights;
+        cached insights are yielded first.
+
+        Args:
+            itineraries: Itineraries to analyse
+            user_preferences: User preferences included in every prompt
+
+        Yields:
+            Index of the itinerary in the request and its insight, in completion order
+        """
+        if len(itineraries) == 0:
+            raise ValueError("At least one itinerary is required")
+
+        weather_conditions = await self._get_weather_conditions(itineraries)
+
+        identities, unique_itineraries = _unique_routes(itineraries)
+        insights, cache_keys = self._get_cached_insights(
+            unique_itineraries, user_preferences, weather_conditions
+        )
+        for index, identity in enumerate(identities):
+            if identity in insights:
+                yield index, insights[identity]
+
+        async def generate(identity: tuple) -> tuple[tuple, ItineraryInsight]:
+            generated = await self._generate_uncached(
+                [unique_itineraries[identity]], user_preferences, weather_conditions
+            )
+            return identity, generated[0]
+
+        tasks = [
+            asyncio.ensure_future(generate(identity))
+            for identity in unique_itineraries
+            if identity not in insights
+        ]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                completed_identity, insight = await next_completed
+                if completed_identity in cache_keys:
+                    insight_cache.set(cache_keys[completed_identity], insight)
+                for index, identity in enumerate(identities):
+                    if identity == completed_identity:
+                        yield index, insight
+        finally:
+            # Stop outstanding LLM calls when the client disconnects or a call fails, and
+            # wait for them so their cancellations and errors are retrieved
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _get_cached_insights(
+        self,
+        unique_itineraries: dict[tuple, Itinerary],
+        user_preferences: list[Preference] | None,
+        weather_conditions: WeatherCondition | None,
+    ) -> tuple[dict[tuple, ItineraryInsight], dict[tuple, bytes]]:
+        """
+        Look up cached insights for distinct routes when the insight cache is enabled.
 
+        Args:
+            unique_itineraries: One itinerary per route identity
+            user_preferences: User preferences included in the prompt
+            weather_conditions: Weather conditions included in the prompt
+
+        Returns:
+            Cached insights found, and the cache key of every route (empty when disabled)
+        """
+        insights: dict[tuple, ItineraryInsight] = {}
+        cache_keys: dict[tuple, bytes] = {}
+        if settings.INSIGHT_CACHE_ENABLED:
+            for identity, itinerary in unique_itineraries.items():
+                cache_keys[identity] = make_insight_cache_key(
+                    itinerary, user_preferences, weather_conditions
+                )
+                cached = insight_cache.get(cache_keys[identity])
+                if cached is not None:
+                    insights[identity] = cached
+        return insights, cache_keys
+
+    async def _generate_uncached(
+        self,
+        itineraries: list[Itinerary],
+        user_preferences: list[Preference] | None,
+        weather_conditions: WeatherCondition | None,
+    ) -> list[ItineraryInsight]:
+        """Generate insights for itineraries with the LLM, batching them into one call."""
         # Create request for the insight agent with weather data
-        request = InsightRequest(
+        # Inputs were validated at the API boundary, so the request skips re-validation
+        request = InsightRequest.trusted(
             itineraries=itineraries,
             user_preferences=user_preferences,
             weather_conditions=weather_conditions,
         )
 
-        # Execute the agent
-        response = await self.insight_agent.execute(request)
+        # Retrying a single itinerary on its own would resend the identical prompt
+        if len(itineraries) == 1:
+            response = await self.insight_agent.execute(request)
+            if not response.itinerary_insights:
+                raise AgentProcessingError("LLM response did not contain an itinerary insight")
+            return response.itinerary_insights[:1]
+
+        # All itineraries are analysed in a single LLM call
+        try:
+            response = await self.insight_agent.execute(request)
+            if len(response.itinerary_insights) == len(itineraries):
+                return response.itinerary_insights
+            logger.warning(
+                f"Expected {len(itineraries)} itinerary insights, "
+                f"got {len(response.itinerary_insights)}; retrying per itinerary"
+            )
+        except AgentProcessingError as error:
+            logger.warning(f"Batched insight generation failed: {error}; retrying per itinerary")
+
+        return await self._generate_insights_individually(request)
+
+    async def _generate_insights_individually(
+        self, request: InsightRequest
+    ) -> list[ItineraryInsight]:
+        """Generate insights with one concurrent LLM call per itinerary."""
+        responses = await self.insight_agent.execute_many(
+            [
+                InsightRequest.trusted(
+                    itineraries=[itinerary],
+                    user_preferences=request.user_preferences,
+                    weather_conditions=request.weather_conditions,
+                )
+                for itinerary in request.itineraries
+            ]
+        )
 
-        return response.itinerary_insights
+        insights = []
+        for response in responses:
+            if not response.itinerary_insights:
+                raise AgentProcessingError("LLM response did not contain an itinerary insight")
+            insights.append(response.itinerary_insights[0])
+        return insights
@@ -1,12 +1,28 @@
 """Weather service for fetching current weather conditions."""
 
+import asyncio
 from datetime import datetime
+import json
+import logging
 
 import aiohttp
 
 from app.config import settings
 from app.schemas.geo import Coordinates
 from app.schemas.weather import WeatherCondition
+from app.services.http import get_http_session
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on accepted response bodies; a current-weather payload is about 1 KB
+_MAX_CONTENT_LENGTH = 1_000_000
+
+# Connection errors and gateway statuses are retried with exponential backoff;
+# timeouts are not, since each attempt may already have waited the full timeout
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_MAX_RETRIES = 2
+_RETRY_BACKOFF = 0.2
 
 
 class WeatherServiceError(Exception):
@@ -23,6 +39,17 @@ class WeatherService:
     def __init__(self):
         self._api_key = settings.OPENWEATHERMAP_API_KEY
         self._base_url = "https://api.openweathermap.org/data/2.5/weather"
+        # Conditions keyed by coordinates rounded to ~1 km, shared by nearby lookups
+        self._cache: TTLCache[tuple[float, float], WeatherCondition] = TTLCache(
+            maxsize=settings.WEATHER_CACHE_MAXSIZE, ttl=settings.WEATHER_CACHE_TTL
+        )
+        # Same entries kept past their fresh TTL, served only when the API is unavailable
+        self._stale_cache: TTLCache[tuple[float, float], WeatherCondition] = TTLCache(
+            maxsize=settings.WEATHER_CACHE_MAXSIZE,
+            ttl=settings.WEATHER_CACHE_TTL + settings.WEATHER_CACHE_STALE_TTL,
+        )
+        # Fetches in progress, awaited by concurrent lookups of the same key
+        self._inflight: dict[tuple[float, float], asyncio.Task[WeatherCondition]] = {}
 
         if not self._api_key:
             raise ValueError("Missing OPENWEATHERMAP_API_KEY")
@@ -32,29 +59,101 @@ class WeatherService:
         if not self._api_key:
             raise ValueError("Missing OpenWeatherMap API key")
 
-        params = {
-            "lat": str(coordinates.latitude),
-            "lon": str(coordinates.longitude),
-            "appid": self._api_key,
-            "units": "metric",
-        }
-        timeout = aiohttp.ClientTimeout(total=5.0)
-
+        cache_key = (round(coordinates.latitude, 2), round(coordinates.longitude, 2))
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Concurrent lookups for the same area share a single upstream request;
+        # shielding keeps one cancelled caller from cancelling it for the others
+        fetch = self._inflight.get(cache_key)
+        if fetch is None:
+            params = {
+                "lat": str(coordinates.latitude),
+                "lon": str(coordinates.longitude),
+                "appid": self._api_key,
+                "units": "metric",
+            }
+            fetch = asyncio.ensure_future(self._fetch_weather(params, cache_key))
+            self._inflight[cache_key] = fetch
+
+            def forget(task: asyncio.Task[WeatherCondition]) -> None:
+                self._inflight.pop(cache_key, None)
+                # Retrieve the error even if every caller was cancelled, so it is not logged
+                # as never retrieved
+                if not task.cancelled():
+                    task.exception()
+
+            fetch.add_done_callback(forget)
+        return await asyncio.shield(fetch)
+
+    async def _fetch_weather(
+        self, params: dict[str, str], cache_key: tuple[float, float]
+    ) -> WeatherCondition:
+        """Fetch current weather from the API and cache it, falling back to stale conditions."""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self._base_url, params=params, timeout=timeout) as response:
-                    if response.status != 200:
-                        raise WeatherServiceUnavailableError(f"{response.status} {response.reason}")
-
-                    data = await response.json()
-
-                    return WeatherCondition(
-                        temperature=data["main"]["temp"],
-                        description=data["weather"][0]["description"],
-                        humidity=data["main"]["humidity"],
-                        wind_speed=data["wind"].get("speed", 0.0),
-                        precipitation=data.get("rain", {}).get("1h", 0.0),
-                        timestamp=datetime.now(),
-                    )
-        except (TimeoutError, aiohttp.ClientError, KeyError) as error:
-            raise WeatherServiceUnavailableError("Failed to fetch weather data") from error
+            attempt = 0
+            while True:
+                try:
+                    weather = await self._request_weather(params)
+                    break
+                except TimeoutError:
+                    # Includes aiohttp's connect and read timeouts
+                    raise
+                except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError):
+                    if attempt == _MAX_RETRIES:
+                        raise
+                await asyncio.sleep(_RETRY_BACKOFF * 2**attempt)
+                attempt += 1
+        except (
+            WeatherServiceUnavailableError,
+            TimeoutError,
+            aiohttp.ClientError,
+            json.JSONDecodeError,
+            KeyError,
+        ) as error:
+            stale = self._stale_cache.get(cache_key) if settings.WEATHER_CACHE_FALLBACK else None
+            if stale is None:
+                if isinstance(error, WeatherServiceUnavailableError):
+                    raise
+                raise WeatherServiceUnavailableError("Failed to fetch weather data") from error
+            logger.warning(
+                f"weather.stale_served: {error}; using conditions from {stale.timestamp}"
+            )
+            return stale
+
+        self._cache.set(cache_key, weather)
+        self._stale_cache.set(cache_key, weather)
+        return weather
+
+    async def _request_weather(self, params: dict[str, str]) -> WeatherCondition:
+        """Make a single current weather request and parse the response."""
+        session = await get_http_session()
+        async with session.get(self._base_url, params=params) as response:
+            if response.status in _RETRY_STATUSES:
+                response.raise_for_status()
+            if response.status != 200:
+                raise WeatherServiceUnavailableError(f"{response.status} {response.reason}")
+            if response.content_length and response.content_length > _MAX_CONTENT_LENGTH:
+                raise WeatherServiceUnavailableError("Weather payload too large")
+
+            # Read incrementally so bodies without a Content-Length are bounded too
+            body = bytearray()
+            async for chunk in response.content.iter_any():
+                body += chunk
+                if len(body) > _MAX_CONTENT_LENGTH:
+                    raise WeatherServiceUnavailableError("Weather payload too large")
+
+        data = json.loads(body)
+
+        main = data["main"]
+        wind = data.get("wind") or {}
+        rain = data.get("rain") or {}
+        return WeatherCondition(
+            temperature=main["temp"],
+            description=data["weather"][0]["description"],
+            humidity=main["humidity"],
+            wind_speed=wind.get("speed", 0.0),
+            precipitation=rain.get("1h", 0.0),
+            timestamp=datetime.now(),
+        )
@@ -1,4 +1,12 @@
+import json
+from unittest.mock import patch
+
 from fastapi.testclient import TestClient
+from starlette.concurrency import run_in_threadpool
+
+from app.dependencies import get_insight_service
+from app.main import app
+from tests.conftest import MockInsightService
 
 
 def test_generate_itineraries_with_insights_success(client: TestClient):
@@ -69,6 +77,16 @@ def test_generate_itineraries_with_insights_empty_list(client: TestClient):
     assert "At least one itinerary is required" in data["detail"]
 
 
+def test_empty_itineraries_rejected_before_service(client: TestClient):
+    """Test that an empty itineraries list never reaches the insight service"""
+    app.dependency_overrides[get_insight_service] = lambda: MockInsightService(should_fail=True)
+
+    response = client.post("/api/v1/insight/itineraries", json={"itineraries": []})
+
+    assert response.status_code == 400
+    assert "At least one itinerary is required" in response.json()["detail"]
+
+
 def test_generate_itineraries_with_insights_no_preferences(client: TestClient):
     """Test without user preferences"""
     payload = {
@@ -141,3 +159,95 @@ def test_generate_itineraries_with_insights_invalid_payload(client: TestClient):
     response = client.post("/api/v1/insight/itineraries", json=payload)
 
     assert response.status_code == 422
+
+
+def test_itineraries_response_documented(client: TestClient):
+    """Test that the response schema stays in the OpenAPI docs"""
+    response = client.get("/openapi.json")
+
+    schema = response.json()["paths"]["/api/v1/insight/itineraries"]["post"]["responses"]["200"]
+    assert schema["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/ItinerariesResponse"
+    }
+
+
+def test_large_response_serialized_in_threadpool(client: TestClient):
+    """Test that large responses are serialized off the event loop"""
+    itinerary = {
+        "start": "2024-01-01T08:00:00",
+        "end": "2024-01-01T09:00:00",
+        "duration": 3600,
+        "walk_distance": 500.0,
+        "walk_time": 600,
+        "legs": [],
+    }
+
+    with (
+        patch("app.api.v1.endpoints.insight._THREADPOOL_MIN_INSIGHTS", 2),
+        patch(
+            "app.api.v1.endpoints.insight.run_in_threadpool", wraps=run_in_threadpool
+        ) as mock_run,
+    ):
+        response = client.post(
+            "/api/v1/insight/itineraries", json={"itineraries": [itinerary, itinerary]}
+        )
+
+    assert response.status_code == 200
+    assert len(response.json()["itinerary_insights"]) == 2
+    mock_run.assert_called_once()
+
+
+def test_stream_itineraries_with_insights(client: TestClient):
+    """Test that insights are streamed as Server-Sent Events"""
+    itinerary = {
+        "start": "2024-01-01T08:00:00",
+        "end": "2024-01-01T09:00:00",
+        "duration": 3600,
+        "walk_distance": 500.0,
+        "walk_time": 600,
+        "legs": [],
+    }
+
+    response = client.post(
+        "/api/v1/insight/itineraries/stream", json={"itineraries": [itinerary, itinerary]}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        json.loads(line.removeprefix("data: "))
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert [event["index"] for event in events] == [0, 1]
+    assert events[0]["insight"]["ai_insight"] == "Mock overall itinerary insight"
+
+
+def test_stream_itineraries_with_insights_empty_list(client: TestClient):
+    """Test that streaming an empty itineraries list is rejected before streaming"""
+    response = client.post("/api/v1/insight/itineraries/stream", json={"itineraries": []})
+
+    assert response.status_code == 400
+    assert "At least one itinerary is required" in response.json()["detail"]
+
+
+def test_stream_itineraries_with_insights_unexpected_error(client: TestClient):
+    """Test that unexpected failures mid-stream are reported as an error event"""
+    app.dependency_overrides[get_insight_service] = lambda: MockInsightService(should_fail=True)
+    itinerary = {
+        "start": "2024-01-01T08:00:00",
+        "end": "2024-01-01T09:00:00",
+        "duration": 3600,
+        "walk_distance": 500.0,
+        "walk_time": 600,
+        "legs": [],
+    }
+
+    response = client.post("/api/v1/insight/itineraries/stream", json={"itineraries": [itinerary]})
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "event: error"
+    assert json.loads(lines[1].removeprefix("data: ")) == {
+        "detail": "Internal server error: Mock insight service error"
+    }
@@ -1,5 +1,6 @@
 from collections.abc import Generator
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import cache
 
 from fastapi.testclient import TestClient
 import pytest
@@ -7,29 +8,108 @@ import pytest
 from app.llm.base import LLMProvider
 from app.main import app
 from app.schemas.geo import Coordinates
-from app.schemas.itinerary import ItineraryInsight, LegInsight
+from app.schemas.itinerary import Itinerary, ItineraryInsight, Leg, LegInsight, Route, TransportMode
+from app.schemas.location import Place
 from app.schemas.weather import WeatherCondition
 from app.services.weather import WeatherServiceError
 
+HELSINKI_CENTRAL = Place(
+    coordinates=Coordinates(latitude=60.1699, longitude=24.9384), name="Helsinki Central"
+)
+ESPOO_CENTRAL = Place(
+    coordinates=Coordinates(latitude=60.2055, longitude=24.6559), name="Espoo Central"
+)
+
+
+# Leg and walking details of each itinerary variant returned by build_itinerary()
+_ITINERARY_VARIANTS = {
+    "bus": {
+        "mode": TransportMode.BUS,
+        "duration": 1800,
+        "distance": 15000,
+        "walk_distance": 200,
+        "walk_time": 120,
+        "route": Route(
+            short_name="550",
+            long_name="Helsinki - Espoo",
+            description="Bus route from Helsinki to Espoo",
+        ),
+    },
+    "tram": {
+        "mode": TransportMode.TRAM,
+        "duration": 2700,
+        "distance": 12000,
+        "walk_distance": 300,
+        "walk_time": 180,
+        "route": Route(short_name="6", long_name="Tram 6", description="Tram route"),
+    },
+}
+
+
+@cache
+def build_itinerary(kind: str = "bus") -> Itinerary:
+    """
+    Build a single-leg Helsinki Central to Espoo Central itinerary.
+
+    Itineraries are frozen, so each variant is validated once and the same
+    instance is returned to every caller.
+
+    Args:
+        kind: "bus" for a 30 min ride on bus 550, "tram" for a 45 min ride on tram 6
+    """
+    variant = _ITINERARY_VARIANTS[kind]
+    start = datetime(2024, 1, 15, 9, 0, 0)
+    end = start + timedelta(seconds=variant["duration"])
+    leg = Leg(
+        mode=variant["mode"],
+        start=start,
+        end=end,
+        duration=variant["duration"],
+        distance=variant["distance"],
+        from_place=HELSINKI_CENTRAL,
+        to_place=ESPOO_CENTRAL,
+        route=variant["route"],
+    )
+    return Itinerary(
+        start=start,
+        end=end,
+        duration=variant["duration"],
+        walk_distance=variant["walk_distance"],
+        walk_time=variant["walk_time"],
+        legs=[leg],
+    )
+
+
+# Chunks yielded by the mock LLM providers' generate_stream
+STREAM_CHUNKS = ("Mock ", "streaming ", "response")
+
 
 class MockLLMProvider(LLMProvider):
     """Mock LLM provider for testing."""
 
-    def __init__(self, response='{"itinerary_insights": []}', should_fail=False, fail_with=None):
+    def __init__(
+        self,
+        response='{"itinerary_insights": []}',
+        should_fail=False,
+        fail_with=None,
+        track_calls=True,
+    ):
         self.response = response
         self.should_fail = should_fail
         self.fail_with = fail_with or Exception
+        self.track_calls = track_calls
         self.generate_calls = []
 
     async def generate(self, messages, max_tokens=None, temperature=None, **kwargs):
         # Record the call for assertion purposes
-        call_info = {
-            "messages": messages,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            **kwargs,
-        }
-        self.generate_calls.append(call_info)
+        if self.track_calls:
+            call_info = {
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                **kwargs,
+            }
+            self.generate_calls.append(call_info)
 
         if self.should_fail:
             raise self.fail_with("Mock LLM error")
@@ -38,7 +118,7 @@ class MockLLMProvider(LLMProvider):
     async def generate_stream(self, messages, max_tokens=None, temperature=None, **kwargs):
         if self.should_fail:
             raise Exception("Mock LLM error")
-        for chunk in ["Mock ", "streaming ", "response"]:
+        for chunk in STREAM_CHUNKS:
             yield chunk
 
 
@@ -72,6 +152,11 @@ class MockInsightService:
 
         return insights
 
+    async def stream_insights(self, itineraries, user_preferences=None):
+        insights = await self.generate_insights(itineraries, user_preferences)
+        for index, insight in enumerate(insights):
+            yield index, insight
+
 
 class MockWeatherService:
     """Mock weather service for testing."""
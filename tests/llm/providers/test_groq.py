@@ -5,12 +5,18 @@ These tests require a valid GROQ_API_KEY environment variable.
 They will be skipped if the API key is not available.
 """
 
+import asyncio
 import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
+import groq
+import httpx
 import pytest
 
-from app.llm.base import LLMError
-from app.llm.providers.groq import GroqProvider
+from app.llm.base import LLMConnectionError, LLMError, LLMRateLimitError, LLMValidationError
+from app.llm.factory import LLMProviderFactory, LLMProviderType
+from app.llm.providers.groq import GroqProvider, _classify_error
 
 
 @pytest.mark.skipif(
@@ -22,8 +28,6 @@ class TestGroqIntegration:
     @pytest.fixture
     def groq_provider(self):
         """Create a Groq provider with real API key."""
-        from unittest.mock import patch
-
         with patch("app.llm.providers.groq.settings") as mock_settings:
             mock_settings.GROQ_API_KEY = os.getenv("GROQ_API_KEY")
             mock_settings.GROQ_MODEL = "llama-3.3-70b-versatile"
@@ -72,8 +76,6 @@ class TestGroqIntegration:
     @pytest.mark.asyncio
     async def test_groq_error_handling(self):
         """Test error handling with invalid API key."""
-        from unittest.mock import patch
-
         with patch("app.llm.providers.groq.settings") as mock_settings:
             mock_settings.GROQ_API_KEY = "invalid-key"
             mock_settings.GROQ_MODEL = "llama-3.3-70b-versatile"
@@ -88,9 +90,6 @@ class TestGroqIntegration:
 @pytest.mark.asyncio
 async def test_groq_config_integration():
     """Test creating Groq provider from configuration."""
-    from unittest.mock import patch
-
-    from app.llm.factory import LLMProviderFactory, LLMProviderType
 
     # Mock the settings to use Groq
     with patch("app.llm.providers.groq.settings") as mock_settings:
@@ -113,8 +112,6 @@ async def test_groq_config_integration():
 
 def test_groq_provider_without_api_key():
     """Test that Groq provider can be instantiated without real API key for testing."""
-    from unittest.mock import patch
-
     with patch("app.llm.providers.groq.settings") as mock_settings:
         mock_settings.GROQ_API_KEY = "test-key"
         mock_settings.GROQ_MODEL = "llama-3.3-70b-versatile"
@@ -123,3 +120,212 @@ def test_groq_provider_without_api_key():
         assert provider._api_key == "test-key"
         assert provider._model == "llama-3.3-70b-versatile"
         assert provider._client is not None
+        assert provider.cache_params["model"] == "llama-3.3-70b-versatile"
+
+
+def test_groq_providers_share_http_client():
+    """Test that Groq providers reuse one pooled HTTP client."""
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        mock_settings.GROQ_MODEL = "llama-3.3-70b-versatile"
+        first = GroqProvider()
+        second = GroqProvider()
+
+        assert first._client._client is second._client._client
+
+
+@pytest.mark.parametrize(
+    ("messages", "expected"),
+    [
+        ([{"role": "system", "content": "Respond in JSON."}], True),
+        (
+            [
+                {"role": "system", "content": "You are helpful."},
+                {"role": "user", "content": "Return a Json object"},
+            ],
+            False,
+        ),
+        ([{"role": "user", "content": "Return a Json object"}], False),
+        ([], False),
+    ],
+)
+def test_should_use_json_format(messages, expected):
+    """Test that JSON mode is detected case-insensitively in the system message only."""
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        provider = GroqProvider()
+
+    assert provider._should_use_json_format(messages) is expected
+
+
+_GROQ_REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+
+def _groq_status_error(error_class, status_code):
+    return error_class(
+        f"Error code: {status_code}",
+        response=httpx.Response(status_code, request=_GROQ_REQUEST),
+        body=None,
+    )
+
+
+@pytest.mark.parametrize(
+    ("error", "error_class", "prefix"),
+    [
+        (
+            _groq_status_error(groq.RateLimitError, 429),
+            LLMRateLimitError,
+            "Groq rate limit exceeded",
+        ),
+        (
+            _groq_status_error(groq.BadRequestError, 400),
+            LLMValidationError,
+            "Groq validation error",
+        ),
+        (
+            _groq_status_error(groq.AuthenticationError, 401),
+            LLMValidationError,
+            "Groq authentication error",
+        ),
+        (groq.APITimeoutError(request=_GROQ_REQUEST), LLMConnectionError, "Groq connection error"),
+        (_groq_status_error(groq.InternalServerError, 500), LLMConnectionError, "Groq API error"),
+        (RuntimeError("Something unexpected"), LLMConnectionError, "Groq API error"),
+    ],
+)
+def test_classify_error(error, error_class, prefix):
+    """Test that Groq client errors map to the matching LLM error type."""
+    classified = _classify_error(error)
+
+    assert type(classified) is error_class
+    assert str(classified) == f"{prefix}: {error}"
+
+
+@pytest.mark.asyncio
+async def test_stream_coalesces_small_deltas():
+    """Test that streamed token deltas are buffered into larger chunks."""
+    deltas = ["a" * 10] * 13 + [None]
+
+    async def fake_stream():
+        for content in deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        provider = GroqProvider()
+
+    provider._client.chat.completions.create = AsyncMock(return_value=fake_stream())
+    with patch("app.llm.providers.groq._STREAM_FLUSH_INTERVAL", float("inf")):
+        chunks = [chunk async for chunk in provider.generate_stream([])]
+
+    assert chunks == ["a" * 70, "a" * 60]
+
+
+@pytest.mark.asyncio
+async def test_stream_flushes_buffer_when_model_stalls():
+    """Test that buffered text is flushed after the interval even if no delta follows."""
+    first_chunk_received = asyncio.Event()
+
+    async def fake_stream():
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="a"))])
+        # Stall until the consumer has received the buffered delta
+        await first_chunk_received.wait()
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="b"))])
+
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        provider = GroqProvider()
+
+    provider._client.chat.completions.create = AsyncMock(return_value=fake_stream())
+    chunks = []
+
+    async def consume():
+        async for chunk in provider.generate_stream([]):
+            chunks.append(chunk)
+            first_chunk_received.set()
+
+    await asyncio.wait_for(consume(), timeout=1)
+
+    assert chunks == ["a", "b"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("max_tokens", "temperature", "expected"),
+    [(None, None, (2048, 0.5)), (100, 0.0, (100, 0.0))],
+)
+async def test_generate_defaults(max_tokens, temperature, expected):
+    """Test that defaults apply only to unset values, so temperature 0 is kept."""
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        provider = GroqProvider()
+
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Hi"))])
+    create = AsyncMock(return_value=completion)
+    provider._client.chat.completions.create = create
+
+    await provider.generate(
+        [{"role": "user", "content": "Hello"}], max_tokens=max_tokens, temperature=temperature
+    )
+
+    params = create.call_args.kwargs
+    assert (params["max_tokens"], params["temperature"]) == expected
+
+
+@pytest.mark.asyncio
+async def test_warmup_opens_connection_to_api():
+    """Test that warming up sends a request to the Groq API base URL."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        with patch("app.llm.providers.groq.settings") as mock_settings:
+            mock_settings.GROQ_API_KEY = "test-key"
+            provider = GroqProvider(http_client=http_client)
+
+        await provider.warmup()
+
+    assert [(r.method, r.url.host) for r in requests] == [("HEAD", "api.groq.com")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error",
+    [
+        httpx.ConnectError("unreachable"),
+        RuntimeError("Cannot send a request, as the client has been closed."),
+        OSError("Network is unreachable"),
+    ],
+)
+async def test_warmup_ignores_errors(error):
+    """Test that a failed warm-up does not raise."""
+
+    def handler(request):
+        raise error
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        with patch("app.llm.providers.groq.settings") as mock_settings:
+            mock_settings.GROQ_API_KEY = "test-key"
+            provider = GroqProvider(http_client=http_client)
+
+        await provider.warmup()
+
+
+@pytest.mark.asyncio
+async def test_generate_respects_caller_response_format():
+    """Test that an explicit response_format is not overridden by JSON detection."""
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        provider = GroqProvider()
+
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Hi"))])
+    create = AsyncMock(return_value=completion)
+    provider._client.chat.completions.create = create
+
+    await provider.generate(
+        [{"role": "system", "content": "Respond in JSON."}], response_format={"type": "text"}
+    )
+
+    assert create.call_args.kwargs["response_format"] == {"type": "text"}
@@ -2,7 +2,8 @@
 Tests for LLM service providers.
 """
 
-from unittest.mock import patch
+import asyncio
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
@@ -14,6 +15,7 @@ from app.llm.base import (
     LLMValidationError,
 )
 from app.llm.factory import LLMProviderFactory
+from tests.conftest import STREAM_CHUNKS
 
 
 class MockLLMProvider(LLMProvider):
@@ -33,7 +35,7 @@ class MockLLMProvider(LLMProvider):
     async def generate_stream(self, messages, max_tokens=None, temperature=None, **kwargs):
         if self.should_fail:
             raise self.fail_with("Mock error")
-        for chunk in ["Mock ", "streaming ", "response"]:
+        for chunk in STREAM_CHUNKS:
             yield chunk
 
 
@@ -84,7 +86,7 @@ class TestLLMProvider:
         async for chunk in mock_provider.generate_stream(messages):
             chunks.append(chunk)
 
-        assert chunks == ["Mock ", "streaming ", "response"]
+        assert chunks == list(STREAM_CHUNKS)
 
     @pytest.mark.asyncio
     async def test_generate_stream_failure(self, failing_provider):
@@ -96,6 +98,151 @@ class TestLLMProvider:
                 pass
 
 
+class RecordingLLMProvider(MockLLMProvider):
+    """Mock LLM provider echoing the last message and tracking concurrent calls."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, messages, max_tokens=None, temperature=None, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            if self.should_fail:
+                raise self.fail_with("Mock error")
+            return messages[-1]["content"]
+        finally:
+            self.in_flight -= 1
+
+
+class TestGenerateBatch:
+    """Test concurrent batch generation on the base provider."""
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_preserves_order(self):
+        """Test that responses are returned in batch order with bounded concurrency."""
+        provider = RecordingLLMProvider()
+        batch = [[{"role": "user", "content": f"Prompt {i}"}] for i in range(5)]
+
+        responses = await provider.generate_batch(batch, max_concurrency=2)
+
+        assert responses == [f"Prompt {i}" for i in range(5)]
+        assert provider.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_respects_shared_limit(self):
+        """Test that batches stay within the process-wide LLM concurrency limit."""
+        provider = RecordingLLMProvider()
+        batch = [[{"role": "user", "content": f"Prompt {i}"}] for i in range(5)]
+
+        with patch("app.llm.base.get_llm_semaphore", return_value=asyncio.Semaphore(1)):
+            responses = await provider.generate_batch(batch, max_concurrency=3)
+
+        assert responses == [f"Prompt {i}" for i in range(5)]
+        assert provider.max_in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_takes_shared_slot_per_attempt(self):
+        """Test that requests waiting for the rate limiter do not hold the shared slot."""
+        provider = MockLLMProvider()
+        shared = asyncio.Semaphore(1)
+        locked_while_waiting = []
+
+        async def record_acquire(self):
+            locked_while_waiting.append(shared.locked())
+
+        batch = [[{"role": "user", "content": f"Prompt {i}"}] for i in range(2)]
+        with (
+            patch("app.llm.base.get_llm_semaphore", return_value=shared),
+            patch("app.llm.base.RateLimiter.acquire", record_acquire),
+        ):
+            await provider.generate_batch(batch, requests_per_minute=60)
+
+        assert locked_while_waiting == [False, False]
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_propagates_errors(self):
+        """Test that a failing generation fails the batch."""
+        provider = RecordingLLMProvider(should_fail=True, fail_with=LLMConnectionError)
+
+        with pytest.raises(LLMConnectionError):
+            await provider.generate_batch([[{"role": "user", "content": "Hello!"}]])
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_retries_rate_limited_requests(self):
+        """Test that rate-limited requests are retried until they succeed."""
+        provider = RecordingLLMProvider()
+        failures = iter([LLMRateLimitError("Slow down"), LLMRateLimitError("Slow down")])
+        generate = provider.generate
+
+        async def flaky_generate(messages, *args, **kwargs):
+            error = next(failures, None)
+            if error:
+                raise error
+            return await generate(messages, *args, **kwargs)
+
+        provider.generate = flaky_generate
+        responses = await provider.generate_batch(
+            [[{"role": "user", "content": "Hello!"}]], max_retries=2, retry_backoff=0
+        )
+
+        assert responses == ["Hello!"]
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_releases_shared_slot_while_backing_off(self):
+        """Test that a rate-limited request does not hold the shared slot during its backoff."""
+        provider = MockLLMProvider()
+        shared = asyncio.Semaphore(1)
+        failures = iter([LLMRateLimitError("Slow down")])
+        generate = provider.generate
+        locked_while_sleeping = []
+
+        async def flaky_generate(messages, *args, **kwargs):
+            error = next(failures, None)
+            if error:
+                raise error
+            return await generate(messages, *args, **kwargs)
+
+        async def record_sleep(delay):
+            locked_while_sleeping.append(shared.locked())
+
+        provider.generate = flaky_generate
+        with (
+            patch("app.llm.base.get_llm_semaphore", return_value=shared),
+            patch("app.llm.base.asyncio.sleep", side_effect=record_sleep),
+        ):
+            await provider.generate_batch([[{"role": "user", "content": "Hello!"}]])
+
+        assert locked_while_sleeping == [False]
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_gives_up_after_max_retries(self):
+        """Test that a request still rate limited after all retries fails the batch."""
+        provider = RecordingLLMProvider(should_fail=True, fail_with=LLMRateLimitError)
+
+        with pytest.raises(LLMRateLimitError):
+            await provider.generate_batch(
+                [[{"role": "user", "content": "Hello!"}]], max_retries=1, retry_backoff=0
+            )
+
+    @pytest.mark.asyncio
+    async def test_generate_batch_spaces_requests_by_rate(self):
+        """Test that a requests-per-minute limit spaces out request starts."""
+        provider = RecordingLLMProvider()
+        batch = [[{"role": "user", "content": f"Prompt {i}"}] for i in range(3)]
+
+        with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await provider.generate_batch(batch, requests_per_minute=60)
+
+        # The provider itself sleeps for 0 seconds on every call
+        delays = [call.args[0] for call in mock_sleep.call_args_list if call.args[0] > 0]
+        assert len(delays) == 2
+        assert all(delay <= 2.0 for delay in delays)
+
+
 class TestLLMExceptions:
     """Test LLM exception hierarchy."""
 
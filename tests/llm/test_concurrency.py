@@ -0,0 +1,38 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.config import settings
+from app.llm.concurrency import RateLimiter, get_llm_semaphore
+
+
+@pytest.mark.asyncio
+async def test_llm_semaphore_shared_within_loop():
+    """Test that all callers on one event loop share the same semaphore."""
+    semaphore = get_llm_semaphore()
+
+    assert semaphore is get_llm_semaphore()
+    assert semaphore._value == settings.LLM_MAX_CONCURRENCY
+
+
+def test_llm_semaphore_created_per_loop():
+    """Test that each event loop gets its own semaphore."""
+
+    async def fetch():
+        return get_llm_semaphore()
+
+    assert asyncio.run(fetch()) is not asyncio.run(fetch())
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_acquisitions():
+    """Test that the limiter delays acquisitions beyond the allowed rate."""
+    limiter = RateLimiter(rate=2, period=1.0)
+
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await limiter.acquire()
+        await limiter.acquire()
+
+    mock_sleep.assert_called_once()
+    assert 0 < mock_sleep.call_args.args[0] <= 0.5
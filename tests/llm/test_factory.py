@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.llm.factory import LLMProviderFactory, LLMProviderType
+from app.llm.http import close_http_client, get_http_client
+
+
+@pytest.mark.asyncio
+async def test_factory_aclose_closes_shared_http_client():
+    """Test that closing the factory closes the client shared by its providers."""
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        mock_settings.GROQ_MODEL = "llama-3.3-70b-versatile"
+        provider = LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ)
+
+    http_client = provider._client._client
+    await LLMProviderFactory.aclose()
+
+    assert http_client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_factory_reuses_providers_for_identical_arguments():
+    """Test that providers are memoized per provider type and arguments."""
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        first = LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ)
+        second = LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ)
+        retrying = LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ, max_retries=5)
+
+    assert first is second
+    assert retrying is not first
+
+    await LLMProviderFactory.aclose()
+    with patch("app.llm.providers.groq.settings") as mock_settings:
+        mock_settings.GROQ_API_KEY = "test-key"
+        assert LLMProviderFactory.create_provider(provider=LLMProviderType.GROQ) is not first
+    await LLMProviderFactory.aclose()
+
+
+def test_factory_rejects_unsupported_provider():
+    """Test that an unknown provider raises instead of caching a missing provider."""
+    with pytest.raises(ValueError, match="Unsupported LLM provider: missing"):
+        LLMProviderFactory.create_provider(provider="missing")
+
+    assert not LLMProviderFactory._providers
+
+
+@pytest.mark.asyncio
+async def test_close_http_client():
+    """Test that closing the shared client releases it and a new one is created on demand."""
+    client = get_http_client()
+
+    await close_http_client()
+
+    assert client.is_closed
+    assert get_http_client() is not client
+    await close_http_client()
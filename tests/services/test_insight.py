@@ -0,0 +1,221 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.agents.base import AgentProcessingError
+from app.services.insight import InsightService, insight_cache, make_insight_cache_key
+from tests.conftest import MockLLMProvider, build_itinerary
+
+ONE_INSIGHT_RESPONSE = (
+    '{"itinerary_insights": [{"ai_insight": "Quick bus ride", '
+    '"leg_insights": [{"ai_insight": "Frequent service"}]}]}'
+)
+TWO_INSIGHTS_RESPONSE = (
+    '{"itinerary_insights": ['
+    '{"ai_insight": "First route", "leg_insights": [{"ai_insight": "Leg one"}]}, '
+    '{"ai_insight": "Second route", "leg_insights": [{"ai_insight": "Leg two"}]}]}'
+)
+
+
+class SequencedLLMProvider(MockLLMProvider):
+    """Mock LLM provider returning a different response for each call."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+
+    async def generate(self, messages, max_tokens=None, temperature=None, **kwargs):
+        self.response = self.responses[len(self.generate_calls)]
+        return await super().generate(messages, max_tokens, temperature, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def itineraries():
+    """Create two single-leg bus itineraries of different durations for testing."""
+    bus = build_itinerary("bus")
+    return [bus, bus.model_copy(update={"duration": 2400})]
+
+
+class TestInsightService:
+    """Test the InsightService batching and fallback behaviour."""
+
+    @pytest.mark.asyncio
+    async def test_itineraries_batched_into_single_call(self, itineraries):
+        """Test that all itineraries are analysed with one LLM call."""
+        llm = MockLLMProvider(response=TWO_INSIGHTS_RESPONSE)
+        service = InsightService(llm_provider=llm)
+
+        insights = await service.generate_insights(itineraries)
+
+        assert [insight.ai_insight for insight in insights] == ["First route", "Second route"]
+        assert len(llm.generate_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_falls_back_per_itinerary_on_count_mismatch(self, itineraries):
+        """Test that a batched response with missing insights is retried per itinerary."""
+        llm = MockLLMProvider(response=ONE_INSIGHT_RESPONSE)
+        service = InsightService(llm_provider=llm)
+
+        insights = await service.generate_insights(itineraries)
+
+        assert len(insights) == 2
+        assert len(llm.generate_calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_falls_back_per_itinerary_on_invalid_json(self, itineraries):
+        """Test that an unparseable batched response is retried per itinerary."""
+        llm = SequencedLLMProvider(["not json", ONE_INSIGHT_RESPONSE, ONE_INSIGHT_RESPONSE])
+        service = InsightService(llm_provider=llm)
+
+        insights = await service.generate_insights(itineraries)
+
+        assert [insight.ai_insight for insight in insights] == ["Quick bus ride"] * 2
+        assert len(llm.generate_calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_single_itinerary_not_retried(self, itineraries):
+        """Test that a failed single-itinerary request is not resent with the same prompt."""
+        llm = MockLLMProvider(response="not json")
+        service = InsightService(llm_provider=llm)
+
+        with pytest.raises(AgentProcessingError):
+            await service.generate_insights(itineraries[:1])
+
+        assert len(llm.generate_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_itineraries_analysed_once(self, itineraries):
+        """Test that identical itineraries in one request share a single insight."""
+        llm = MockLLMProvider(response=ONE_INSIGHT_RESPONSE)
+        service = InsightService(llm_provider=llm)
+        later = itineraries[0].model_copy(update={"start": datetime(2024, 1, 15, 9, 10, 0)})
+
+        insights = await service.generate_insights([itineraries[0], later])
+
+        assert [insight.ai_insight for insight in insights] == ["Quick bus ride"] * 2
+        assert len(llm.generate_calls) == 1
+        assert "Route Options (1)" in llm.generate_calls[0]["messages"][1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_similar_itineraries_analysed_separately(self, itineraries):
+        """Test that routes differing by less than a cache bucket are not merged."""
+        llm = MockLLMProvider(response=TWO_INSIGHTS_RESPONSE)
+        service = InsightService(llm_provider=llm)
+        slower = itineraries[0].model_copy(update={"duration": 2090, "walk_distance": 290})
+
+        insights = await service.generate_insights([itineraries[0], slower])
+
+        assert [insight.ai_insight for insight in insights] == ["First route", "Second route"]
+        assert "Route Options (2)" in llm.generate_calls[0]["messages"][1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_stream_insights_yields_each_itinerary(self, itineraries):
+        """Test that streamed insights are generated per itinerary and tagged by index."""
+        llm = MockLLMProvider(response=ONE_INSIGHT_RESPONSE)
+        service = InsightService(llm_provider=llm)
+
+        results = [result async for result in service.stream_insights(itineraries)]
+
+        assert sorted(index for index, _ in results) == [0, 1]
+        assert all(insight.ai_insight == "Quick bus ride" for _, insight in results)
+        assert len(llm.generate_calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_insights_analyses_duplicates_once(self, itineraries):
+        """Test that streamed duplicate routes share one LLM call and are yielded for each."""
+        llm = MockLLMProvider(response=ONE_INSIGHT_RESPONSE)
+        service = InsightService(llm_provider=llm)
+        later = itineraries[0].model_copy(update={"start": datetime(2024, 1, 15, 9, 10, 0)})
+
+        results = [result async for result in service.stream_insights([itineraries[0], later])]
+
+        assert [index for index, _ in results] == [0, 1]
+        assert len(llm.generate_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_insights_reaps_remaining_calls_on_failure(self, itineraries):
+        """Test that calls still running when the stream fails are awaited after cancelling."""
+        llm = MockLLMProvider(response="not json")
+        service = InsightService(llm_provider=llm)
+
+        with patch("app.services.insight.asyncio.gather", wraps=asyncio.gather) as mock_gather:
+            with pytest.raises(AgentProcessingError):
+                async for _ in service.stream_insights(itineraries):
+                    pass
+
+        tasks = mock_gather.call_args.args
+        assert len(tasks) == 2
+        assert all(task.done() for task in tasks)
+
+    @pytest.mark.asyncio
+    async def test_fallback_without_insight_raises(self, itineraries):
+        """Test that an empty per-itinerary response is reported as a processing error."""
+        llm = MockLLMProvider(response='{"itinerary_insights": []}')
+        service = InsightService(llm_provider=llm)
+
+        with pytest.raises(AgentProcessingError):
+            await service.generate_insights(itineraries)
+
+
+class TestInsightCache:
+    """Test the per-itinerary insight cache."""
+
+    @pytest.fixture(autouse=True)
+    def enable_cache(self):
+        """Enable the insight cache with a clean state for each test."""
+        insight_cache.clear()
+        with patch("app.services.insight.settings.INSIGHT_CACHE_ENABLED", True):
+            yield
+        insight_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_cached_itineraries_skip_llm(self, itineraries):
+        """Test that repeated itineraries are answered from the cache."""
+        llm = MockLLMProvider(response=TWO_INSIGHTS_RESPONSE)
+        service = InsightService(llm_provider=llm)
+
+        first = await service.generate_insights(itineraries)
+        second = await service.generate_insights(itineraries)
+
+        assert second == first
+        assert len(llm.generate_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_only_misses_sent_to_llm(self, itineraries):
+        """Test that cached insights are stitched back in order around new ones."""
+        llm = SequencedLLMProvider([ONE_INSIGHT_RESPONSE, ONE_INSIGHT_RESPONSE])
+        service = InsightService(llm_provider=llm)
+        await service.generate_insights([itineraries[1]])
+
+        llm.responses[1] = ONE_INSIGHT_RESPONSE.replace("Quick bus ride", "New route")
+        insights = await service.generate_insights(itineraries)
+
+        assert [insight.ai_insight for insight in insights] == ["New route", "Quick bus ride"]
+        assert len(llm.generate_calls) == 2
+        assert "Route Options (1)" in llm.generate_calls[1]["messages"][1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_stream_insights_uses_cache(self, itineraries):
+        """Test that streamed requests reuse and fill the insight cache."""
+        llm = MockLLMProvider(response=ONE_INSIGHT_RESPONSE)
+        service = InsightService(llm_provider=llm)
+        await service.generate_insights([itineraries[1]])
+
+        results = [result async for result in service.stream_insights(itineraries)]
+        [result async for result in service.stream_insights(itineraries)]
+
+        assert [index for index, _ in results] == [1, 0]
+        assert len(llm.generate_calls) == 2
+
+    def test_cache_key_ignores_departure_time(self, itineraries):
+        """Test that the same route at a different time of day shares a key."""
+        later = itineraries[0].model_copy(update={"start": datetime(2024, 1, 15, 17, 0, 0)})
+
+        assert make_insight_cache_key(later, None, None) == make_insight_cache_key(
+            itineraries[0], None, None
+        )
+        assert make_insight_cache_key(itineraries[0], None, None) != make_insight_cache_key(
+            itineraries[1], None, None
+        )
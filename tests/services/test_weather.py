@@ -0,0 +1,259 @@
+import asyncio
+import gc
+import json
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import pytest
+
+from app.config import settings
+from app.schemas.geo import Coordinates
+from app.services.http import close_http_session, get_http_session
+from app.services.weather import WeatherService, WeatherServiceUnavailableError
+
+HELSINKI = Coordinates(latitude=60.1699, longitude=24.9384)
+ESPOO = Coordinates(latitude=60.2055, longitude=24.6559)
+
+WEATHER_PAYLOAD = {
+    "main": {"temp": 3.5, "humidity": 80},
+    "weather": [{"description": "light rain"}],
+    "wind": {"speed": 4.2},
+    "rain": {"1h": 0.3},
+}
+
+
+@pytest.fixture
+async def weather_api():
+    """Serve canned OpenWeatherMap responses from a local test server."""
+    state = {
+        "status": 200,
+        "failures": 0,
+        "payload": WEATHER_PAYLOAD,
+        "chunked": False,
+        "requests": [],
+    }
+
+    async def handler(request):
+        state["requests"].append(dict(request.query))
+        if state["failures"]:
+            state["failures"] -= 1
+            return web.Response(status=503)
+        if state["status"] != 200:
+            return web.Response(status=state["status"])
+        if state["chunked"]:
+            # Stream the body without a Content-Length header
+            response = web.StreamResponse()
+            response.enable_chunked_encoding()
+            await response.prepare(request)
+            await response.write(json.dumps(state["payload"]).encode())
+            await response.write_eof()
+            return response
+        return web.json_response(state["payload"])
+
+    app = web.Application()
+    app.router.add_get("/weather", handler)
+    async with TestServer(app) as server:
+        server.state = state
+        yield server
+
+
+@pytest.fixture
+async def weather_service(weather_api):
+    """Create a weather service pointed at the local test server."""
+    with patch.object(settings, "OPENWEATHERMAP_API_KEY", "test-key"):
+        service = WeatherService()
+    service._base_url = str(weather_api.make_url("/weather"))
+    with patch("app.services.weather._RETRY_BACKOFF", 0):
+        yield service
+    await close_http_session()
+
+
+class TestWeatherService:
+    """Test the WeatherService against a local HTTP server."""
+
+    @pytest.mark.asyncio
+    async def test_get_current_weather(self, weather_service, weather_api):
+        """Test that the API response is mapped to a weather condition."""
+        weather = await weather_service.get_current_weather(HELSINKI)
+
+        assert weather.temperature == 3.5
+        assert weather.description == "light rain"
+        assert weather.precipitation == 0.3
+        assert weather_api.state["requests"][0]["appid"] == "test-key"
+
+    @pytest.mark.asyncio
+    async def test_uses_shared_session(self, weather_service):
+        """Test that requests go through the process-wide HTTP session."""
+        await weather_service.get_current_weather(HELSINKI)
+        session = await get_http_session()
+        await weather_service.get_current_weather(ESPOO)
+
+        assert await get_http_session() is session
+
+    @pytest.mark.asyncio
+    async def test_error_status_raises_unavailable(self, weather_service, weather_api):
+        """Test that a non-200 response is reported as the service being unavailable."""
+        weather_api.state["status"] = 503
+
+        with pytest.raises(WeatherServiceUnavailableError):
+            await weather_service.get_current_weather(HELSINKI)
+
+    @pytest.mark.asyncio
+    async def test_nearby_coordinates_served_from_cache(self, weather_service, weather_api):
+        """Test that coordinates rounding to the same key reuse the cached conditions."""
+        first = await weather_service.get_current_weather(HELSINKI)
+        nearby = Coordinates(latitude=60.1701, longitude=24.9381)
+        second = await weather_service.get_current_weather(nearby)
+
+        assert second is first
+        assert len(weather_api.state["requests"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_distant_coordinates_fetched_separately(self, weather_service, weather_api):
+        """Test that coordinates with a different rounded key are fetched from the API."""
+        await weather_service.get_current_weather(HELSINKI)
+        await weather_service.get_current_weather(ESPOO)
+
+        assert len(weather_api.state["requests"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_stale_conditions_served_when_api_unavailable(self, weather_service, weather_api):
+        """Test that expired conditions are returned instead of failing during an outage."""
+        first = await weather_service.get_current_weather(HELSINKI)
+        weather_service._cache.clear()
+        weather_api.state["status"] = 503
+
+        assert await weather_service.get_current_weather(HELSINKI) is first
+
+    @pytest.mark.asyncio
+    async def test_stale_fallback_disabled(self, weather_service, weather_api):
+        """Test that outages raise when the stale fallback is switched off."""
+        await weather_service.get_current_weather(HELSINKI)
+        weather_service._cache.clear()
+        weather_api.state["status"] = 503
+
+        with (
+            patch.object(settings, "WEATHER_CACHE_FALLBACK", False),
+            pytest.raises(WeatherServiceUnavailableError),
+        ):
+            await weather_service.get_current_weather(HELSINKI)
+
+    @pytest.mark.asyncio
+    async def test_oversized_payload_rejected(self, weather_service, weather_api):
+        """Test that a response larger than the content length limit is not read."""
+        weather_api.state["payload"] = {**WEATHER_PAYLOAD, "padding": "x" * 1_000_000}
+
+        with pytest.raises(WeatherServiceUnavailableError, match="too large"):
+            await weather_service.get_current_weather(HELSINKI)
+
+    @pytest.mark.asyncio
+    async def test_chunked_response_parsed(self, weather_service, weather_api):
+        """Test that a body streamed without a Content-Length is read and parsed."""
+        weather_api.state["chunked"] = True
+
+        weather = await weather_service.get_current_weather(HELSINKI)
+
+        assert weather.temperature == 3.5
+
+    @pytest.mark.asyncio
+    async def test_oversized_chunked_response_rejected(self, weather_service, weather_api):
+        """Test that the body size limit also applies without a Content-Length header."""
+        weather_api.state["chunked"] = True
+        weather_api.state["payload"] = {**WEATHER_PAYLOAD, "padding": "x" * 1_000_000}
+
+        with pytest.raises(WeatherServiceUnavailableError, match="too large"):
+            await weather_service.get_current_weather(HELSINKI)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_request(self, weather_service, weather_api):
+        """Test that simultaneous lookups of the same area make a single upstream call."""
+        results = await asyncio.gather(
+            *(weather_service.get_current_weather(HELSINKI) for _ in range(3))
+        )
+
+        assert results[0] is results[1] is results[2]
+        assert len(weather_api.state["requests"]) == 1
+        assert not weather_service._inflight
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_retried(self, weather_service, weather_api):
+        """Test that a gateway error is retried and the later success is returned."""
+        weather_api.state["failures"] = 2
+
+        weather = await weather_service.get_current_weather(HELSINKI)
+
+        assert weather.description == "light rain"
+        assert len(weather_api.state["requests"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, weather_service, weather_api):
+        """Test that persistent gateway errors raise once the retries are exhausted."""
+        weather_api.state["status"] = 503
+
+        with pytest.raises(WeatherServiceUnavailableError):
+            await weather_service.get_current_weather(HELSINKI)
+
+        assert len(weather_api.state["requests"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self, weather_service, weather_api):
+        """Test that non-transient error statuses fail without retrying."""
+        weather_api.state["status"] = 401
+
+        with pytest.raises(WeatherServiceUnavailableError):
+            await weather_service.get_current_weather(HELSINKI)
+
+        assert len(weather_api.state["requests"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_timeouts_not_retried(self, weather_service, weather_api):
+        """Test that a timed-out request fails without further attempts."""
+        with (
+            patch.object(
+                WeatherService, "_request_weather", side_effect=TimeoutError
+            ) as request_weather,
+            pytest.raises(WeatherServiceUnavailableError),
+        ):
+            await weather_service.get_current_weather(HELSINKI)
+
+        assert request_weather.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_fetch_without_callers_is_retrieved(self, weather_service):
+        """Test that a fetch failing after all its callers were cancelled is not reported."""
+        release = asyncio.Event()
+
+        async def request_weather(params):
+            await release.wait()
+            raise TimeoutError
+
+        loop = asyncio.get_running_loop()
+        errors = []
+        previous_handler = loop.get_exception_handler()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        try:
+            with patch.object(WeatherService, "_request_weather", side_effect=request_weather):
+                caller = asyncio.ensure_future(weather_service.get_current_weather(HELSINKI))
+                await asyncio.sleep(0)
+                caller.cancel()
+                release.set()
+                while weather_service._inflight:
+                    await asyncio.sleep(0)
+            gc.collect()
+        finally:
+            loop.set_exception_handler(previous_handler)
+
+        assert errors == []
+
+
+@pytest.mark.asyncio
+async def test_close_http_session():
+    """Test that closing the shared session releases it and a new one is created on demand."""
+    session = await get_http_session()
+
+    await close_http_session()
+
+    assert session.closed
+    assert await get_http_session() is not session
+    await close_http_session()
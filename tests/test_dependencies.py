@@ -0,0 +1,50 @@
+"""
+Tests for application dependency providers.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.config import settings
+from app.dependencies import get_insight_service, get_weather_service
+from app.services.weather import WeatherService
+from tests.conftest import MockLLMProvider
+
+
+@pytest.fixture(autouse=True)
+def clear_services():
+    get_weather_service.cache_clear()
+    get_insight_service.cache_clear()
+    yield
+    get_weather_service.cache_clear()
+    get_insight_service.cache_clear()
+
+
+def test_weather_service_is_shared():
+    """Test that one weather service instance is reused across requests."""
+    with patch.object(settings, "OPENWEATHERMAP_API_KEY", "test-key"):
+        first = get_weather_service()
+        second = get_weather_service()
+
+    assert isinstance(first, WeatherService)
+    assert first is second
+
+
+def test_weather_service_without_api_key():
+    """Test that a missing API key disables weather instead of failing."""
+    with patch.object(settings, "OPENWEATHERMAP_API_KEY", None):
+        assert get_weather_service() is None
+
+
+def test_insight_service_is_shared():
+    """Test that the insight service and its LLM provider are created only once."""
+    with patch(
+        "app.services.insight.LLMProviderFactory.create_provider",
+        return_value=MockLLMProvider(),
+    ) as mock_create:
+        first = get_insight_service(weather_service=None)
+        second = get_insight_service(weather_service=None)
+
+    assert first is second
+    mock_create.assert_called_once()
@@ -0,0 +1,36 @@
+"""
+Tests for the application lifespan.
+"""
+
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app.config import settings
+from app.dependencies import get_insight_service
+from app.main import app
+from tests.conftest import MockLLMProvider
+
+
+@pytest.fixture(autouse=True)
+def clear_services():
+    get_insight_service.cache_clear()
+    yield
+    get_insight_service.cache_clear()
+
+
+def test_shutdown_drops_cached_services():
+    """Test that services holding closed HTTP clients are rebuilt after a restart."""
+    with (
+        patch.object(settings, "GROQ_API_KEY", None),
+        patch(
+            "app.services.insight.LLMProviderFactory.create_provider",
+            side_effect=lambda **kwargs: MockLLMProvider(),
+        ),
+    ):
+        with TestClient(app):
+            before = get_insight_service(None)
+
+        with TestClient(app):
+            assert get_insight_service(None) is not before
@@ -0,0 +1,55 @@
+"""
+Tests for in-memory caching utilities.
+"""
+
+from unittest.mock import patch
+
+from app.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test the TTL cache."""
+
+    def test_get_missing_key(self):
+        """Test that missing keys return None."""
+        cache: TTLCache[str, str] = TTLCache(maxsize=2, ttl=60)
+        assert cache.get("missing") is None
+
+    def test_set_and_get(self):
+        """Test that stored values are returned."""
+        cache: TTLCache[str, str] = TTLCache(maxsize=2, ttl=60)
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+        assert len(cache) == 1
+
+    def test_entries_expire(self):
+        """Test that entries are dropped once their TTL has passed."""
+        cache: TTLCache[str, str] = TTLCache(maxsize=2, ttl=60)
+
+        with patch("app.utils.cache.time.monotonic", return_value=100.0):
+            cache.set("key", "value")
+        with patch("app.utils.cache.time.monotonic", return_value=159.0):
+            assert cache.get("key") == "value"
+        with patch("app.utils.cache.time.monotonic", return_value=160.0):
+            assert cache.get("key") is None
+
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_clear(self):
+        """Test that clear removes all entries."""
+        cache: TTLCache[str, str] = TTLCache(maxsize=2, ttl=60)
+        cache.set("key", "value")
+        cache.clear()
+        assert cache.get("key") is None